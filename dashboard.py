@@ -131,14 +131,23 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 3. HELPER FUNCTIES ---
-def normalize_number(raw_num):
+def _nationale_cijfers(raw_num):
     s = str(raw_num)
     digits = "".join(filter(str.isdigit, s))
     if digits.startswith("0031"): digits = digits[4:]
     if digits.startswith("31"):   digits = digits[2:]
     if digits.startswith("0"):    digits = digits[1:]
+    return digits
+
+def normalize_number(raw_num):
+    digits = _nationale_cijfers(raw_num)
     return f"+31{digits}" if len(digits) == 9 else None
 
+def normalize_prefix(raw_num, min_digits=3):
+    # Zelfde regels als normalize_number, maar voor een onvolledig nummer (prefix-zoeken)
+    digits = _nationale_cijfers(raw_num)
+    return f"+31{digits}" if min_digits <= len(digits) < 9 else None
+
 def fetch_all(table, columns, page_size=1000):
     # Supabase geeft default max 1000 rows terug — paginate om alles op te halen
     rows = []
@@ -212,6 +221,31 @@ def cached_kpi_counts(vandaag):
     todo = supabase.table('leads').select("*", count='exact', head=True).eq('status', 'new').execute().count
     return succes, fail, todo
 
+LOOKUP_KOLOMMEN = "phone,name,batch_id,status,result,ended_reason,ended_at,duration,recording"
+LOOKUP_LIMIT = 25
+
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def cached_lead_lookup(nummer, is_prefix):
+    # Alleen index-lookups op leads.phone / blacklist.phone (unique) — nooit de hele tabel.
+    # Prefix-zoeken via LIKE 'x%' heeft een text_pattern_ops index nodig:
+    #   create index if not exists leads_phone_prefix_idx on leads (phone text_pattern_ops);
+    #   create index if not exists blacklist_phone_prefix_idx on blacklist (phone text_pattern_ops);
+    q = supabase.table('leads').select(LOOKUP_KOLOMMEN)
+    if is_prefix:
+        leads = q.like('phone', f"{nummer}%").limit(LOOKUP_LIMIT).execute().data or []
+        geblokt = existing_phones('blacklist', [lead['phone'] for lead in leads])
+        # Ook geblokkeerde nummers zonder lead moeten gevonden worden
+        res = supabase.table('blacklist').select('phone').like('phone', f"{nummer}%").limit(LOOKUP_LIMIT).execute()
+        geblokt.update(row['phone'] for row in (res.data or []))
+        # Bij afgekapte leads kan een blacklist-treffer toch een lead hebben: gericht ophalen
+        ontbrekend = geblokt - {lead['phone'] for lead in leads}
+        if ontbrekend and len(leads) == LOOKUP_LIMIT:
+            leads += supabase.table('leads').select(LOOKUP_KOLOMMEN).in_('phone', sorted(ontbrekend)).execute().data or []
+    else:
+        leads = q.eq('phone', nummer).execute().data or []
+        geblokt = existing_phones('blacklist', [nummer])
+    return leads, geblokt
+
 @st.cache_data(ttl=30, show_spinner=False)
 def cached_config(key, default=None):
     try:
@@ -429,6 +463,62 @@ with st.expander("📊 Batch Rapportage", expanded=False):
                 else:
                     st.info("Vink eerst 'Bevestig verwijderen' aan.")
 
+# --- LEAD ZOEKEN ---
+with st.expander("🔎 Lead Zoeken", expanded=False):
+    # text_input triggert pas bij Enter / focus weg — geen query per toetsaanslag
+    zoek_invoer = st.text_input("Telefoonnummer of begin van nummer", key="lead_zoek",
+                                placeholder="bv. 06 12345678, of alleen het begin: 0612")
+    recent = st.session_state.setdefault("recente_lookups", [])
+
+    if zoek_invoer.strip():
+        nummer = normalize_number(zoek_invoer)
+        is_prefix = nummer is None
+        if is_prefix:
+            nummer = normalize_prefix(zoek_invoer)
+
+        # Alleen '+31' / '0031' is een begin, geen fout: pas waarschuwen zonder cijfers of bij te veel
+        heeft_cijfers = any(c.isdigit() for c in zoek_invoer)
+        if not nummer and (not heeft_cijfers or len(_nationale_cijfers(zoek_invoer)) > 9):
+            st.warning("Ongeldig nummer — verwacht een Nederlands nummer zoals 06 12345678.")
+        elif not nummer:
+            st.info("Typ minimaal het begin van het nummer, bv. 0612 of +31612.")
+        else:
+            try:
+                t0 = time.perf_counter()
+                gevonden, geblokt = cached_lead_lookup(nummer, is_prefix)
+                duur_ms = (time.perf_counter() - t0) * 1000
+            except Exception as e:
+                st.error(f"Kan lead niet opzoeken: {e}")
+                gevonden, geblokt = None, set()
+
+            if gevonden is not None:
+                if nummer in recent: recent.remove(nummer)
+                recent.insert(0, nummer)
+                del recent[5:]
+
+                zoek_label = f"{nummer}…" if is_prefix else nummer
+                st.caption(f"{len(gevonden)} leads · {len(geblokt)} op blacklist voor {zoek_label} · {duur_ms:.0f} ms")
+
+                if not is_prefix and nummer in geblokt:
+                    st.warning(f"⛔ {nummer} staat op de blacklist.")
+
+                # Blacklist-nummers zonder lead als losse rij tonen
+                lead_phones = {lead['phone'] for lead in gevonden}
+                rijen = gevonden + [{"phone": p} for p in sorted(geblokt - lead_phones)]
+
+                if rijen:
+                    df_zoek = pd.DataFrame(rijen, columns=LOOKUP_KOLOMMEN.split(","))
+                    df_zoek.insert(1, "blacklist", df_zoek['phone'].isin(geblokt))
+                    st.dataframe(df_zoek, hide_index=True,
+                                 column_config={"recording": st.column_config.LinkColumn("recording")})
+                    if is_prefix and len(gevonden) >= LOOKUP_LIMIT:
+                        st.caption(f"Alleen de eerste {LOOKUP_LIMIT} treffers — typ meer cijfers om te verfijnen.")
+                else:
+                    st.info("Geen lead gevonden voor dit nummer.")
+
+    if recent:
+        st.caption("Recent gezocht: " + " · ".join(recent))
+
 # --- 9. IMPORT MODULE ---
 with st.expander("📂 Leads & Blacklist Importeren", expanded=False):
     import_doel = st.radio("Waar wil je dit bestand importeren?", ["📞 Leads voor Dialer", "⛔ Nummers voor Blacklist"])
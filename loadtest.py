@@ -0,0 +1,510 @@
+# Load-test harness voor dashboard.py.
+#
+# Simuleert N operators die tegelijk het dashboard gebruiken (batch kiezen,
+# periode wisselen, lead zoeken, start/stop, exporteren) via Streamlit's
+# AppTest, tegen een lokale nep-Supabase met instelbare latency. Rapporteert
+# queries per rerun, cache hit ratio, p50/p95 rerun-latency en backend QPS.
+#
+#   python loadtest.py --sessies 8 --rondes 25 --latency-ms 40
+#   python loadtest.py --max-queries-per-rerun 4 --max-queries start_stop=18
+#       # faalt (exit 1) als een actie gemiddeld meer queries per rerun doet
+#
+# De grenzen: een nieuwe batch/periode kost 4 count-queries (cached_batch_stats).
+# Start/stop leegt alle caches, dus die rerun haalt alles opnieuw op (14) plus
+# een openstaande lead-zoekopdracht (tot 4: leads, blacklist IN, blacklist
+# LIKE en de IN-lookup als de leads afgekapt zijn).
+#
+# AppTest gebruikt proces-globale state (Runtime._instance, st.secrets), dus
+# sessies draaien om-en-om in één thread in plaats van echt parallel. De
+# st.cache_data caches worden wel gedeeld tussen sessies, net als in productie.
+# Daarom rapporteren we naast de gemeten QPS ook de geprojecteerde QPS voor N
+# operators die elk na hun denktijd weer klikken.
+import argparse
+import math
+import os
+import random
+import re
+import sys
+import time
+import types
+from datetime import date, datetime, timedelta
+
+import streamlit as st
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+APP_PAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+
+GEEN_GEHOOR_REDENEN = ["customer-did-not-answer", "no-answer-transfer", "voicemail", "silence-timed-out"]
+OVERIGE_REDENEN = ["customer-ended-call", "assistant-ended-call"]
+
+
+# --- 1. NEP-BACKEND ---
+class Resultaat:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class NepBackend:
+    # In-memory stand-in voor de Supabase tabellen; telt elke execute() en
+    # slaapt latency_ms (+/- jitter) om netwerk + Postgres na te bootsen.
+    def __init__(self, latency_ms=30, jitter_ms=10, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rng = random.Random(seed)
+        self.tabellen = {"leads": [], "blacklist": [], "config": []}
+        self.queries = 0
+
+    def vul(self, aantal_leads, aantal_batches):
+        vandaag = date.today()
+        batches = [f"import_{(vandaag - timedelta(days=3 * i)).isoformat()}" for i in range(aantal_batches - 1)]
+        batches.append("oude_import")
+        for i in range(aantal_leads):
+            lead = {
+                "phone": f"+316{i:08d}",
+                "name": "Klant",
+                "batch_id": self.rng.choice(batches),
+                "status": "new",
+                "result": None,
+                "ended_reason": None,
+                "ended_at": None,
+                "duration": None,
+                "recording": None,
+                "original_data": {"naam": "Klant", "telefoon": f"06{i:08d}"},
+            }
+            if self.rng.random() < 0.6:
+                gebeld = datetime.combine(vandaag, datetime.min.time()) - timedelta(
+                    days=self.rng.randint(0, 40), seconds=self.rng.randint(0, 86399))
+                lead["status"] = "done"
+                lead["ended_at"] = gebeld.strftime("%Y-%m-%d %H:%M:%S")
+                lead["duration"] = self.rng.randint(5, 300)
+                if self.rng.random() < 0.4:
+                    lead["ended_reason"] = self.rng.choice(GEEN_GEHOOR_REDENEN)
+                else:
+                    lead["ended_reason"] = self.rng.choice(OVERIGE_REDENEN)
+                    lead["result"] = "SUCCES" if self.rng.random() < 0.3 else "MISLUKT"
+            self.tabellen["leads"].append(lead)
+            if i % 50 == 0:
+                self.tabellen["blacklist"].append({"phone": lead["phone"]})
+        # Geblokkeerde nummers zonder lead (zie actie_lead_zoeken)
+        for i in range(max(aantal_leads // 100, 1)):
+            self.tabellen["blacklist"].append({"phone": f"+31699{i:06d}"})
+        self.tabellen["config"] = [
+            {"key": "status", "value": "UIT"},
+            {"key": "speed", "value": "20"},
+            {"key": "vapi_health", "value": "OK"},
+        ]
+
+    def execute(self, query):
+        self.queries += 1
+        vertraging = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(vertraging, 0) / 1000)
+        return query.uitvoeren(self.tabellen)
+
+    def rpc(self, naam):
+        if naam != "batches_overzicht":
+            raise ValueError(f"Onbekende RPC: {naam}")
+        return RpcQuery(self)
+
+
+class RpcQuery:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def execute(self):
+        return self.backend.execute(self)
+
+    def uitvoeren(self, tabellen):
+        per_batch = {}
+        for lead in tabellen["leads"]:
+            b = per_batch.setdefault(lead["batch_id"], {"batch_id": lead["batch_id"], "totaal": 0, "te_bellen": 0})
+            b["totaal"] += 1
+            if lead["status"] == "new":
+                b["te_bellen"] += 1
+        return Resultaat(list(per_batch.values()))
+
+
+class NepQuery:
+    # Ondersteunt precies de PostgREST-builder calls die dashboard.py gebruikt.
+    def __init__(self, backend, tabel):
+        self.backend = backend
+        self.tabel = tabel
+        self.actie = "select"
+        self.kolommen = "*"
+        self.count = None
+        self.head = False
+        self.filters = []
+        self.bereik = None
+        self.max_rijen = None
+        self.waarden = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+
+    def select(self, kolommen="*", count=None, head=False):
+        self.kolommen, self.count, self.head = kolommen, count, head
+        return self
+
+    def update(self, waarden):
+        self.actie, self.waarden = "update", waarden
+        return self
+
+    def delete(self):
+        self.actie = "delete"
+        return self
+
+    def upsert(self, rijen, on_conflict=None, ignore_duplicates=False):
+        self.actie = "upsert"
+        self.waarden = rijen if isinstance(rijen, list) else [rijen]
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def eq(self, kolom, waarde):
+        self.filters.append(lambda r: r.get(kolom) == waarde)
+        return self
+
+    def in_(self, kolom, waarden):
+        waarden = set(waarden)
+        self.filters.append(lambda r: r.get(kolom) in waarden)
+        return self
+
+    def gte(self, kolom, waarde):
+        self.filters.append(lambda r: r.get(kolom) is not None and str(r[kolom]) >= waarde)
+        return self
+
+    def lte(self, kolom, waarde):
+        self.filters.append(lambda r: r.get(kolom) is not None and str(r[kolom]) <= waarde)
+        return self
+
+    def like(self, kolom, patroon):
+        regex = re.compile(re.escape(patroon).replace("%", ".*").replace("_", "."))
+        self.filters.append(lambda r: r.get(kolom) is not None and regex.fullmatch(str(r[kolom])) is not None)
+        return self
+
+    def limit(self, n):
+        self.max_rijen = n
+        return self
+
+    def range(self, start, eind):
+        self.bereik = (start, eind)
+        return self
+
+    def execute(self):
+        return self.backend.execute(self)
+
+    def uitvoeren(self, tabellen):
+        rijen = tabellen[self.tabel]
+        if self.actie == "upsert":
+            sleutel = self.on_conflict or ("key" if self.tabel == "config" else "phone")
+            index = {r[sleutel]: r for r in rijen}
+            for nieuw in self.waarden:
+                if nieuw[sleutel] in index:
+                    if not self.ignore_duplicates:
+                        index[nieuw[sleutel]].update(nieuw)
+                else:
+                    rij = dict(nieuw)
+                    rijen.append(rij)
+                    index[rij[sleutel]] = rij
+            return Resultaat(list(self.waarden))
+
+        gevonden = [r for r in rijen if all(f(r) for f in self.filters)]
+        if self.actie == "update":
+            for r in gevonden:
+                r.update(self.waarden)
+            return Resultaat(gevonden)
+        if self.actie == "delete":
+            weg = {id(r) for r in gevonden}
+            tabellen[self.tabel] = [r for r in rijen if id(r) not in weg]
+            return Resultaat(gevonden)
+
+        if self.bereik:
+            gevonden = gevonden[self.bereik[0]:self.bereik[1] + 1]
+        if self.max_rijen is not None:
+            gevonden = gevonden[:self.max_rijen]
+        if self.kolommen != "*":
+            namen = [k.strip() for k in self.kolommen.split(",")]
+            gevonden = [{k: r.get(k) for k in namen} for r in gevonden]
+        else:
+            gevonden = [dict(r) for r in gevonden]
+        return Resultaat(None if self.head else gevonden, len(gevonden) if self.count else None)
+
+
+class NepClient:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def table(self, naam):
+        return NepQuery(self.backend, naam)
+
+    def rpc(self, naam, params=None):
+        return self.backend.rpc(naam)
+
+
+# --- 2. CACHE INSTRUMENTATIE ---
+class CacheTeller:
+    def __init__(self):
+        self.aanroepen = 0
+        self.missers = 0
+
+
+class TellendeCacheData:
+    # Vervangt st.cache_data: elke aanroep telt, een misser is wanneer de
+    # functie-body echt draait. Key en source blijven gelijk via __wrapped__.
+    def __init__(self, echt, teller):
+        self.echt = echt
+        self.teller = teller
+
+    def __call__(self, func=None, **kwargs):
+        teller = self.teller
+
+        def decoreer(f):
+            def body(*args, **kw):
+                teller.missers += 1
+                return f(*args, **kw)
+            body.__wrapped__ = f
+            body.__module__, body.__qualname__, body.__name__ = f.__module__, f.__qualname__, f.__name__
+            gecachet = self.echt(**kwargs)(body)
+
+            def aanroep(*args, **kw):
+                teller.aanroepen += 1
+                return gecachet(*args, **kw)
+            aanroep.clear = gecachet.clear
+            return aanroep
+
+        return decoreer(func) if func is not None else decoreer
+
+    def clear(self):
+        self.echt.clear()
+
+
+# --- 3. OPERATOR SCENARIO'S ---
+def _widget(lijst, label_begin):
+    for w in lijst:
+        if w.label.startswith(label_begin) and not w.disabled:
+            return w
+    return None
+
+
+def actie_verversen(at, rng):
+    return at.run()
+
+
+def actie_status_filter(at, rng):
+    w = _widget(at.selectbox, "Status")
+    return w.select(rng.choice(w.options)).run() if w else at.run()
+
+
+def actie_batch_kiezen(at, rng):
+    w = _widget(at.selectbox, "Batch (")
+    return w.select(rng.choice(w.options)).run() if w else at.run()
+
+
+def actie_periode_wisselen(at, rng):
+    w = _widget(at.selectbox, "Periode")
+    opties = [o for o in w.options if o != "Aangepast"] if w else []
+    return w.select(rng.choice(opties)).run() if w else at.run()
+
+
+def actie_start_stop(at, rng):
+    label = "▶ START DIALER" if rng.random() < 0.5 else "⏹ STOP DIALER"
+    w = _widget(at.button, label)
+    return w.click().run() if w else at.run()
+
+
+def actie_lead_zoeken(at, rng):
+    # Terugbeller: bestaande lead, blacklist-nummer zonder lead of onbekend;
+    # meestal een volledig nummer, soms alleen het begin
+    nummer = rng.choice([
+        f"06{rng.randrange(1000):08d}",
+        f"0699{rng.randrange(20):06d}",
+        f"06{rng.randrange(10 ** 8):08d}",
+    ])
+    invoer = nummer if rng.random() < 0.7 else nummer[:rng.randint(5, 8)]
+    return at.text_input(key="lead_zoek").input(invoer).run()
+
+
+def actie_exporteren(at, rng):
+    w = _widget(at.button, "Download Excel")
+    return w.click().run() if w else at.run()
+
+
+# (actie, gewicht) — verhouding zoals operators het dashboard gebruiken
+SCENARIO = [
+    (actie_verversen, 4),
+    (actie_batch_kiezen, 4),
+    (actie_periode_wisselen, 3),
+    (actie_status_filter, 2),
+    (actie_lead_zoeken, 2),
+    (actie_start_stop, 1),
+    (actie_exporteren, 1),
+]
+ACTIE_NAMEN = {"eerste_load"} | {actie.__name__.removeprefix("actie_") for actie, _ in SCENARIO}
+
+
+# --- 4. RAPPORTAGE ---
+def percentiel(waarden, p):
+    if not waarden:
+        return 0.0
+    gesorteerd = sorted(waarden)
+    # Nearest-rank: kleinste waarde waarvoor minstens p% van de metingen <= is
+    idx = max(0, min(len(gesorteerd) - 1, math.ceil(p / 100 * len(gesorteerd)) - 1))
+    return gesorteerd[idx]
+
+
+def draai(sessies=4, rondes=20, latency_ms=30, jitter_ms=10, leads=20000, batches=6, denktijd_s=5.0, seed=0):
+    rng = random.Random(seed)
+    backend = NepBackend(latency_ms, jitter_ms, seed)
+    backend.vul(leads, batches)
+
+    nep_supabase = types.ModuleType("supabase")
+    nep_supabase.create_client = lambda url, key: NepClient(backend)
+    teller = CacheTeller()
+    echte_cache_data = st.cache_data
+    oude_module = sys.modules.get("supabase")
+
+    sys.modules["supabase"] = nep_supabase
+    st.cache_data = TellendeCacheData(echte_cache_data, teller)
+    echte_cache_data.clear()
+    st.cache_resource.clear()
+
+    metingen = []  # (actie, seconden, queries, cache aanroepen, cache missers)
+    fouten = 0
+    try:
+        apps = []
+        for i in range(sessies):
+            at = AppTest.from_file(APP_PAD, default_timeout=60)
+            at.secrets["SUPABASE_URL"] = "http://nep-supabase.local"
+            at.secrets["SUPABASE_KEY"] = "nep"
+            apps.append(at)
+
+        acties, gewichten = zip(*SCENARIO)
+        start = time.perf_counter()
+        for ronde in range(rondes + 1):
+            volgorde = list(range(sessies))
+            rng.shuffle(volgorde)
+            for i in volgorde:
+                at = apps[i]
+                # Ronde 0 is de eerste (cache-koude) page load van elke sessie
+                actie = actie_verversen if ronde == 0 else rng.choices(acties, gewichten)[0]
+                naam = "eerste_load" if ronde == 0 else actie.__name__.removeprefix("actie_")
+                q0, a0, m0 = backend.queries, teller.aanroepen, teller.missers
+                t0 = time.perf_counter()
+                actie(at, rng)
+                duur = time.perf_counter() - t0
+                metingen.append((naam, duur, backend.queries - q0,
+                                 teller.aanroepen - a0, teller.missers - m0))
+                fouten += len(at.exception) + len(at.error)
+        totaal_s = time.perf_counter() - start
+    finally:
+        st.cache_data = echte_cache_data
+        if oude_module is not None:
+            sys.modules["supabase"] = oude_module
+        else:
+            sys.modules.pop("supabase", None)
+
+    # Latency en queries per rerun alleen over interacties; de eerste loads
+    # staan apart in per_actie zodat ze de percentielen niet vertekenen.
+    interacties = [m for m in metingen if m[0] != "eerste_load"] or metingen
+    duren = [m[1] for m in interacties]
+    queries = [m[2] for m in interacties]
+    queries_totaal = sum(m[2] for m in metingen)
+    aanroepen = sum(m[3] for m in metingen)
+    missers = sum(m[4] for m in metingen)
+    gem_queries = sum(queries) / len(queries)
+    gem_duur = sum(duren) / len(duren)
+
+    per_actie = {}
+    for naam, duur, q, _, _ in metingen:
+        per_actie.setdefault(naam, []).append((duur, q))
+
+    return {
+        "sessies": sessies,
+        "reruns": len(metingen),
+        "fouten": fouten,
+        "queries_totaal": queries_totaal,
+        "queries_per_rerun": gem_queries,
+        "queries_per_rerun_max": max(queries),
+        "cache_hit_ratio": (aanroepen - missers) / aanroepen if aanroepen else 0.0,
+        "p50_ms": percentiel(duren, 50) * 1000,
+        "p95_ms": percentiel(duren, 95) * 1000,
+        "qps_gemeten": queries_totaal / totaal_s if totaal_s else 0.0,
+        "qps_geprojecteerd": sessies * gem_queries / (denktijd_s + gem_duur),
+        "per_actie": {
+            naam: {
+                "reruns": len(r),
+                "queries_per_rerun": sum(q for _, q in r) / len(r),
+                "p95_ms": percentiel([d for d, _ in r], 95) * 1000,
+            }
+            for naam, r in per_actie.items()
+        },
+    }
+
+
+def fan_out_overschrijdingen(r, max_standaard=None, max_per_actie=None):
+    # Per actie gemeten, zodat een regressie in één actie niet wegvalt tegen
+    # de goedkope acties in het gemiddelde.
+    max_per_actie = max_per_actie or {}
+    overschreden = []
+    for naam, a in sorted(r["per_actie"].items()):
+        grens = max_per_actie.get(naam, None if naam == "eerste_load" else max_standaard)
+        if grens is not None and a["queries_per_rerun"] > grens:
+            overschreden.append((naam, a["queries_per_rerun"], grens))
+    return overschreden
+
+
+def _actie_grens(tekst):
+    naam, _, grens = tekst.partition("=")
+    if not naam or not grens:
+        raise argparse.ArgumentTypeError(f"verwacht ACTIE=N, niet '{tekst}'")
+    naam = naam.strip()
+    if naam not in ACTIE_NAMEN:
+        raise argparse.ArgumentTypeError(
+            f"onbekende actie '{naam}', kies uit: {', '.join(sorted(ACTIE_NAMEN))}")
+    return naam, float(grens)
+
+
+def print_rapport(r, denktijd_s):
+    print(f"Sessies: {r['sessies']}  ·  reruns: {r['reruns']}  ·  app-fouten: {r['fouten']}")
+    print("(queries per rerun en latency zonder de eerste page load per sessie)")
+    print(f"Queries per rerun:   gem {r['queries_per_rerun']:.2f}  ·  max {r['queries_per_rerun_max']}  ·  totaal {r['queries_totaal']}")
+    print(f"Cache hit ratio:     {r['cache_hit_ratio']:.1%}")
+    print(f"Rerun latency:       p50 {r['p50_ms']:.0f} ms  ·  p95 {r['p95_ms']:.0f} ms")
+    print(f"Backend QPS:         gemeten {r['qps_gemeten']:.1f}  ·  geprojecteerd {r['qps_geprojecteerd']:.1f} "
+          f"({r['sessies']} operators, {denktijd_s:g}s denktijd)")
+    print()
+    print(f"{'actie':<24}{'reruns':>8}{'q/rerun':>10}{'p95 ms':>10}")
+    for naam, a in sorted(r["per_actie"].items()):
+        print(f"{naam:<24}{a['reruns']:>8}{a['queries_per_rerun']:>10.2f}{a['p95_ms']:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test voor het Vapi dashboard tegen een nep-Supabase.")
+    parser.add_argument("--sessies", type=int, default=4, help="aantal gelijktijdige operators")
+    parser.add_argument("--rondes", type=int, default=20, help="interacties per sessie (na de eerste page load)")
+    parser.add_argument("--latency-ms", type=float, default=30, help="gemiddelde latency per backend-query")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="spreiding rond de latency")
+    parser.add_argument("--leads", type=int, default=20000, help="aantal leads in de nep-database")
+    parser.add_argument("--batches", type=int, default=6, help="aantal batches in de nep-database")
+    parser.add_argument("--denktijd", type=float, default=5.0, help="seconden tussen klikken per operator (voor QPS-projectie)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-queries-per-rerun", type=float, default=None,
+                        help="faal (exit 1) als een actie gemiddeld meer queries per rerun doet — vangt query fan-out regressies")
+    parser.add_argument("--max-queries", type=_actie_grens, action="append", default=[], metavar="ACTIE=N",
+                        help="grens voor één actie (bv. start_stop=16), overschrijft --max-queries-per-rerun; herhaalbaar")
+    args = parser.parse_args()
+
+    # "No runtime found" / "missing ScriptRunContext" is ruis buiten een echte server
+    set_log_level("error")
+    rapport = draai(args.sessies, args.rondes, args.latency_ms, args.jitter_ms,
+                    args.leads, args.batches, args.denktijd, args.seed)
+    print_rapport(rapport, args.denktijd)
+
+    if rapport["fouten"]:
+        print(f"\n❌ {rapport['fouten']} exceptions/st.error meldingen in de app tijdens de test.")
+        sys.exit(1)
+    overschreden = fan_out_overschrijdingen(rapport, args.max_queries_per_rerun, dict(args.max_queries))
+    for naam, q, grens in overschreden:
+        print(f"\n❌ Query fan-out in {naam}: {q:.2f} queries per rerun (max {grens:g}).")
+    if overschreden:
+        sys.exit(1)